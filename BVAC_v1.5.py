@@ -1,14 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import csv
-import math
 import os
-import json
 import sys
+from functools import lru_cache
 
 # File to store settings
 SETTINGS_FILE = "settings.json"
 
+# Delay before saving settings after a toggle (ms)
+SAVE_SETTINGS_DELAY_MS = 250
+
 # Armour types with points per ton
 RAW_ARMOUR_TYPES = {
     "Standard": 16.0,
@@ -21,174 +22,254 @@ RAW_ARMOUR_TYPES = {
     "Clan Ferro-Lamellor": 14.0
 }
 
-# Format options for dropdown (shows points per ton)
-ARMOUR_OPTIONS = [f"{name} ({value:.2f} pts/ton)" for name, value in RAW_ARMOUR_TYPES.items()]
-ARMOUR_LOOKUP = dict(zip(ARMOUR_OPTIONS, RAW_ARMOUR_TYPES.values()))
+# Vehicle facings, in the order points are allocated and displayed
+FACINGS_WITH_TURRET = ("Front", "Left Side", "Right Side", "Rear", "Turret")
+FACINGS_NO_TURRET = FACINGS_WITH_TURRET[:-1]
+FRONT, REAR, TURRET = 0, 3, 4
+
+# Original distribution (percentage of total armour per facing)
+PCTS_WITH_TURRET = (0.30, 0.208, 0.208, 0.117, 0.167)
+
+# Turret removed and its percentage redistributed evenly
+_turret_share = PCTS_WITH_TURRET[TURRET]
+PCTS_NO_TURRET = tuple(pct + _turret_share / len(FACINGS_NO_TURRET) for pct in PCTS_WITH_TURRET[:TURRET])
+
+# Turret adjusted to 25% with the reduction taken from sides and rear
+_reducible_total = sum(PCTS_WITH_TURRET[1:TURRET])
+_delta = 0.25 - _turret_share
+PCTS_REINFORCED_TURRET = (PCTS_WITH_TURRET[FRONT],) + tuple(
+    pct - _delta * (pct / _reducible_total) for pct in PCTS_WITH_TURRET[1:TURRET]
+) + (0.25,)
+
+# Colour themes for the GUI (root, results text, canvas and ttk styles)
+DARK_THEME = {
+    "root": {"bg": "gray15"},
+    "text": {"bg": "gray20", "fg": "white"},
+    "canvas": {"bg": "gray15"},
+    "styles": {
+        "TFrame": {"background": "gray15"},
+        "TLabel": {"background": "gray15", "foreground": "white"},
+        "TCheckbutton": {"background": "gray15", "foreground": "white"},
+        "TButton": {"background": "gray20", "foreground": "white"},
+        "TEntry": {"fieldbackground": "gray25", "foreground": "white"},
+        "TMenubutton": {"background": "gray20", "foreground": "white"}
+    }
+}
+
+LIGHT_THEME = {
+    "root": {"bg": "SystemButtonFace"},
+    "text": {"bg": "white", "fg": "black"},
+    "canvas": {"bg": "white"},
+    "styles": {
+        "TFrame": {"background": "SystemButtonFace"},
+        "TLabel": {"background": "SystemButtonFace", "foreground": "black"},
+        "TCheckbutton": {"background": "SystemButtonFace", "foreground": "black"},
+        "TButton": {"background": "SystemButtonFace", "foreground": "black"},
+        "TEntry": {"fieldbackground": "white", "foreground": "black"},
+        "TMenubutton": {"background": "SystemButtonFace", "foreground": "black"}
+    }
+}
+
+# Diagram geometry per facing: rectangle coords, label position, label abbreviation, fill
+DIAGRAM_LAYOUT = {
+    "Front": ((80, 20, 120, 60), (100, 40), "Fr", "gray20"),
+    "Left Side": ((40, 60, 80, 100), (60, 80), "Ls", "gray20"),
+    "Right Side": ((120, 60, 160, 100), (140, 80), "Rs", "gray20"),
+    "Rear": ((80, 100, 120, 140), (100, 120), "Rr", "gray20"),
+    "Turret": ((80, 60, 120, 100), (100, 80), "Tu", "gray40")
+}
+
+# Canvas item ids and label abbreviation (rectangle, text, abbrev) per facing, filled in by init_canvas_items
+canvas_items = {}
+
+# Inputs of the last successful calculation (None until the first run)
+last_calculation_key = None
+
+# Rows and results text produced by the last calculation
+last_calculation_output = None
+
+# Scheduled settings save (Tk "after" id), None when nothing is pending
+pending_settings_save = None
+
+# Theme currently applied to the GUI (None until the first apply)
+current_theme = None
 
 def round_to_nearest_5(n: float) -> int:
     """Rounds a number to the nearest multiple of 5."""
-    return 5 * round(n / 5)
+    return (round(n) + 2) // 5 * 5
 
 def round_up_to_5(n: float) -> int:
     """Rounds a number up to the nearest multiple of 5."""
-    return 5 * math.ceil(n / 5)
+    return int(-(-n // 5)) * 5
+
+def armour_label(name: str) -> str:
+    """Formats an armour type name for display (shows points per ton)."""
+    return f"{name} ({RAW_ARMOUR_TYPES[name]:.2f} pts/ton)"
 
 def save_settings():
-    """Saves the current dark mode setting to a JSON file."""
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump({"dark_mode": dark_mode.get()}, f)
+    """Saves the current dark mode setting to a JSON file via a temp file and rename."""
+    global pending_settings_save
+    import json
+    pending_settings_save = None
+    data = json.dumps({"dark_mode": dark_mode.get()}).encode()
+    tmp_path = SETTINGS_FILE + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, SETTINGS_FILE)
+    except OSError:
+        # Don't leave a stale temp file behind if the write or rename failed
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
 
 def load_settings():
     """Loads dark mode setting from a JSON file if it exists."""
-    if os.path.exists(SETTINGS_FILE):
+    import json
+    try:
         with open(SETTINGS_FILE, "r") as f:
-            return json.load(f)
-    return {"dark_mode": True}
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return {"dark_mode": True}
 
-def calculate_armour_distribution(total_armour_points: int, round_each: bool = False, remove_turret: bool = False, reinforce_turret: bool = False) -> dict:
+@lru_cache(maxsize=256)
+def distribute_core(total_armour_points: int, round_each: bool, remove_turret: bool, reinforce_turret: bool) -> tuple:
     """
-    Distribute total armour points to vehicle facings.
-    Handles optional turret removal and optional rounding.
+    Pure numeric core of the armour distribution.
+    Returns the points per facing in the order of FACINGS_WITH_TURRET
+    (or FACINGS_NO_TURRET when the turret is removed).
     """
 
-    # Original distribution
-    base_distribution = {
-        "Front": 0.30,
-        "Left Side": 0.208,
-        "Right Side": 0.208,
-        "Rear": 0.117,
-        "Turret": 0.167
-    }
-
-    distribution_percent = base_distribution.copy()
-
-    # Remove Turret and redistribute its percentage evenly
+    # Pick the precomputed distribution for the selected turret option
     if remove_turret:
-        turret_share = distribution_percent.pop("Turret")
-        for loc in distribution_percent:
-            distribution_percent[loc] += turret_share / len(distribution_percent)
-
-    # Adjust turret to 25% and redistribute reduction from sides and rear
-    if reinforce_turret and not remove_turret:
-        delta = 0.25 - distribution_percent["Turret"]
-        distribution_percent["Turret"] = 0.25
-        reducible = ["Left Side", "Right Side", "Rear"]
-        reducible_total = sum(distribution_percent[k] for k in reducible)
-        for k in reducible:
-            distribution_percent[k] -= delta * (distribution_percent[k] / reducible_total)
+        pcts = PCTS_NO_TURRET
+    elif reinforce_turret:
+        pcts = PCTS_REINFORCED_TURRET
+    else:
+        pcts = PCTS_WITH_TURRET
 
     # Calculate unrounded point allocations
-    raw_allocations = {loc: total_armour_points * pct for loc, pct in distribution_percent.items()}
+    raw_allocations = [total_armour_points * pct for pct in pcts]
 
     if not round_each:
-        # Basic integer rounding
-        armour_distribution = {loc: round(points) for loc, points in raw_allocations.items()}
-        allocated = sum(armour_distribution.values())
-        leftover = total_armour_points - allocated
-        if leftover > 0:
-            for loc in distribution_percent:
-                if leftover == 0:
-                    break
-                armour_distribution[loc] += 1
-                leftover -= 1
+        # Basic integer rounding, leftover handed out one point per facing from the front
+        allocations = [round(points) for points in raw_allocations]
+        leftover = total_armour_points - sum(allocations)
+        for i in range(min(leftover, len(allocations))):
+            allocations[i] += 1
     else:
         # Rounding to nearest 5 (front rounds up)
-        rounded_allocations = {}
-        for loc, points in raw_allocations.items():
-            if loc == "Front":
-                rounded_allocations[loc] = round_up_to_5(points)
-            else:
-                rounded_allocations[loc] = round_to_nearest_5(points)
+        allocations = [round_up_to_5(raw_allocations[FRONT])]
+        allocations += [round_to_nearest_5(points) for points in raw_allocations[1:]]
 
-        total_rounded = sum(rounded_allocations.values())
+        total_rounded = sum(allocations)
 
         if total_rounded > total_armour_points:
             overage = total_rounded - total_armour_points
-            if "Rear" in rounded_allocations and rounded_allocations["Rear"] >= overage:
-                rounded_allocations["Rear"] -= overage
+            if allocations[REAR] >= overage:
+                allocations[REAR] -= overage
             else:
-                deficit = overage - rounded_allocations.get("Rear", 0)
-                rounded_allocations["Rear"] = 0
-                if "Turret" in rounded_allocations:
-                    rounded_allocations["Turret"] = max(0, rounded_allocations["Turret"] - deficit)
+                deficit = overage - allocations[REAR]
+                allocations[REAR] = 0
+                if len(allocations) > TURRET:
+                    allocations[TURRET] = max(0, allocations[TURRET] - deficit)
         elif total_rounded < total_armour_points:
-            rounded_allocations["Front"] += total_armour_points - total_rounded
+            allocations[FRONT] += total_armour_points - total_rounded
 
-        armour_distribution = rounded_allocations
+    return tuple(allocations)
 
-    return armour_distribution
+def calculate_armour_distribution(total_armour_points: int, round_each: bool = False, remove_turret: bool = False, reinforce_turret: bool = False) -> dict:
+    """
+    Distribute total armour points to vehicle facings.
+    Handles optional turret removal and optional rounding.
+    """
+    facings = FACINGS_NO_TURRET if remove_turret else FACINGS_WITH_TURRET
+    return dict(zip(facings, distribute_core(total_armour_points, round_each, remove_turret, reinforce_turret)))
 
 def run_calculation():
     """Main calculation function triggered by GUI."""
+    global last_calculation_key, last_calculation_output
     try:
         tons = float(entry_tonnage.get())
-        selected_label = armour_type.get()
-        points_per_ton = ARMOUR_LOOKUP[selected_label]
-        total_armour_points = int(tons * points_per_ton)
-
-        layout = calculate_armour_distribution(
-            total_armour_points,
-            round_each=round_each_location.get(),
-            remove_turret=remove_turret.get(),
-            reinforce_turret=reinforce_turret.get()
-        )
-
-        # Clear and display results
-        result_text.delete("1.0", tk.END)
-        result_text.insert(tk.END, f"Armour Type: {selected_label}\n")
-        result_text.insert(tk.END, f"Total Armour Points: {total_armour_points}\n")
-        result_text.insert(tk.END, f"Total Armour Weight: {tons:.2f} tons\n\n")
-
-        draw_diagram(layout)
-
-        for loc, pts in layout.items():
-            weight = pts / points_per_ton
-            result_text.insert(tk.END, f"{loc}: {pts} points ({weight:.2f} tons)\n")
-
-        # Save CSV if enabled
+        armour_name = armour_type.get()
+        round_each = round_each_location.get()
+        no_turret = remove_turret.get()
+        reinforce = reinforce_turret.get()
+
+        key = (tons, armour_name, round_each, no_turret, reinforce)
+        if key == last_calculation_key:
+            # Same inputs as last run: reuse its output and leave the canvas as is,
+            # only restoring the results text if it has been edited since
+            rows, results = last_calculation_output
+            if result_text.get("1.0", "end-1c") != results:
+                result_text.delete("1.0", tk.END)
+                result_text.insert(tk.END, results)
+        else:
+            points_per_ton = RAW_ARMOUR_TYPES[armour_name]
+            total_armour_points = int(tons * points_per_ton)
+
+            layout = calculate_armour_distribution(
+                total_armour_points,
+                round_each=round_each,
+                remove_turret=no_turret,
+                reinforce_turret=reinforce
+            )
+
+            # Points and formatted weight per facing, shared by the results display and the CSV export
+            fmt2 = "{:.2f}".format
+            rows = [(loc, pts, fmt2(pts / points_per_ton)) for loc, pts in layout.items()]
+
+            # Clear and display results in a single insert
+            parts = [
+                f"Armour Type: {armour_label(armour_name)}\n",
+                f"Total Armour Points: {total_armour_points}\n",
+                f"Total Armour Weight: {fmt2(tons)} tons\n\n"
+            ]
+            parts += [f"{loc}: {pts} points ({weight} tons)\n" for loc, pts, weight in rows]
+            results = "".join(parts)
+            result_text.delete("1.0", tk.END)
+            result_text.insert(tk.END, results)
+
+            draw_diagram(layout)
+
+            last_calculation_key = key
+            last_calculation_output = (rows, results)
+
+        # Save CSV if enabled (also when the inputs are unchanged, so it can be re-saved)
         if save_csv.get():
+            import csv
             with open("armour_distribution.csv", mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["Facing", "Armour Points", "Weight (tons)"])
-                for loc, pts in layout.items():
-                    weight = pts / points_per_ton
-                    writer.writerow([loc, pts, f"{weight:.2f}"])
+                csv_rows = [("Facing", "Armour Points", "Weight (tons)")]
+                csv_rows += rows
+                csv.writer(file).writerows(csv_rows)
             messagebox.showinfo("Success", "Armour distribution saved to 'armour_distribution.csv'")
 
     except ValueError:
         messagebox.showerror("Input Error", "Please enter a valid number for tonnage.")
 
 # --- GUI Setup ---
-def draw_diagram(layout):
-    """Draws a top-down vehicle layout on canvas showing armor per facing."""
-    canvas.delete("all")
-    canvas.create_rectangle(80, 20, 120, 60, fill="gray20")  # Front
-    canvas.create_text(100, 40, text=f"Fr\n{layout.get('Front', 0)}", font=("Arial", 8), fill="white")
+def init_canvas_items():
+    """Creates the diagram rectangle and label for each facing once, hidden until first drawn."""
+    for loc, (rect, text_pos, abbrev, fill) in DIAGRAM_LAYOUT.items():
+        rect_id = canvas.create_rectangle(*rect, fill=fill, state="hidden")
+        text_id = canvas.create_text(*text_pos, font=("Arial", 8), fill="white", state="hidden")
+        canvas_items[loc] = (rect_id, text_id, abbrev)
 
-    canvas.create_rectangle(40, 60, 80, 100, fill="gray20")  # Left
-    canvas.create_text(60, 80, text=f"Ls\n{layout.get('Left Side', 0)}", font=("Arial", 8), fill="white")
-
-    canvas.create_rectangle(120, 60, 160, 100, fill="gray20")  # Right
-    canvas.create_text(140, 80, text=f"Rs\n{layout.get('Right Side', 0)}", font=("Arial", 8), fill="white")
-
-    canvas.create_rectangle(80, 100, 120, 140, fill="gray20")  # Rear
-    canvas.create_text(100, 120, text=f"Rr\n{layout.get('Rear', 0)}", font=("Arial", 8), fill="white")
-
-    if "Turret" in layout:
-        canvas.create_rectangle(80, 60, 120, 100, fill="gray40")
-        canvas.create_text(100, 80, text=f"Tu\n{layout.get('Turret', 0)}", font=("Arial", 8), fill="white")
+def draw_diagram(layout):
+    """Updates the top-down vehicle layout on canvas showing armor per facing."""
+    for loc, (rect_id, text_id, abbrev) in canvas_items.items():
+        state = "normal" if loc in layout else "hidden"
+        canvas.itemconfigure(rect_id, state=state)
+        canvas.itemconfigure(text_id, state=state, text=f"{abbrev}\n{layout.get(loc, 0)}")
 
 def create_tooltip(widget, text):
-    """Creates a tooltip popup for any given widget."""
-    tooltip = tk.Toplevel(widget)
-    tooltip.withdraw()
-    tooltip.overrideredirect(True)
-    label = tk.Label(tooltip, text=text, background="lightyellow", relief="solid", borderwidth=1, font=("Arial", 8))
-    label.pack()
-
+    """Attaches a tooltip to any given widget, shown in the shared tooltip window."""
     def enter(event):
         x = widget.winfo_rootx() + 20
         y = widget.winfo_rooty() + 20
+        tooltip_label.configure(text=text)
         tooltip.geometry(f"+{x}+{y}")
         tooltip.deiconify()
 
@@ -198,41 +279,37 @@ def create_tooltip(widget, text):
     widget.bind("<Enter>", enter)
     widget.bind("<Leave>", leave)
 
-def apply_dark_mode():
-    """Applies dark theme to the GUI."""
-    root.configure(bg="gray15")
-    style = ttk.Style()
-    style.theme_use("clam")
-    style.configure("TFrame", background="gray15")
-    style.configure("TLabel", background="gray15", foreground="white")
-    style.configure("TCheckbutton", background="gray15", foreground="white")
-    style.configure("TButton", background="gray20", foreground="white")
-    style.configure("TEntry", fieldbackground="gray25", foreground="white")
-    style.configure("TMenubutton", background="gray20", foreground="white")
-    result_text.configure(bg="gray20", fg="white")
-    canvas.configure(bg="gray15")
-
-def apply_light_mode():
-    """Applies light (default) theme to the GUI."""
-    root.configure(bg="SystemButtonFace")
-    style = ttk.Style()
-    style.theme_use("clam")
-    style.configure("TFrame", background="SystemButtonFace")
-    style.configure("TLabel", background="SystemButtonFace", foreground="black")
-    style.configure("TCheckbutton", background="SystemButtonFace", foreground="black")
-    style.configure("TButton", background="SystemButtonFace", foreground="black")
-    style.configure("TEntry", fieldbackground="white", foreground="black")
-    style.configure("TMenubutton", background="SystemButtonFace", foreground="black")
-    result_text.configure(bg="white", fg="black")
-    canvas.configure(bg="white")
+def apply_theme(theme):
+    """Applies a colour theme to the GUI, only restyling what differs from the active theme."""
+    global current_theme
+    if theme is current_theme:
+        return
+    previous_styles = current_theme["styles"] if current_theme else {}
+    root.configure(**theme["root"])
+    for name, options in theme["styles"].items():
+        if previous_styles.get(name) != options:
+            style.configure(name, **options)
+    result_text.configure(**theme["text"])
+    canvas.configure(**theme["canvas"])
+    current_theme = theme
 
 def toggle_mode():
     """Toggles between light and dark mode and saves preference."""
-    if dark_mode.get():
-        apply_dark_mode()
-    else:
-        apply_light_mode()
-    save_settings()
+    global pending_settings_save
+    apply_theme(DARK_THEME if dark_mode.get() else LIGHT_THEME)
+    # Debounce the save so rapid toggling only writes the file once
+    if pending_settings_save is not None:
+        root.after_cancel(pending_settings_save)
+    pending_settings_save = root.after(SAVE_SETTINGS_DELAY_MS, save_settings)
+
+def on_close():
+    """Flushes any pending settings save before closing the window."""
+    try:
+        if pending_settings_save is not None:
+            root.after_cancel(pending_settings_save)
+            save_settings()
+    finally:
+        root.destroy()
 
 # GUI Setup
 root = tk.Tk()
@@ -250,6 +327,18 @@ except Exception as e:
 
 root.title("BattleTech Vehicle Armour Calculator")
 root.geometry("480x650")
+root.protocol("WM_DELETE_WINDOW", on_close)
+
+# Single ttk style object shared by both themes
+style = ttk.Style(root)
+style.theme_use("clam")
+
+# Single tooltip window shared by all widgets
+tooltip = tk.Toplevel(root)
+tooltip.withdraw()
+tooltip.overrideredirect(True)
+tooltip_label = tk.Label(tooltip, background="lightyellow", relief="solid", borderwidth=1, font=("Arial", 8))
+tooltip_label.pack()
 
 frame = ttk.Frame(root, padding=10)
 frame.pack(fill=tk.BOTH, expand=True)
@@ -272,8 +361,15 @@ create_tooltip(entry_tonnage, "How many tons of armour the vehicle carries")
 
 # Armour type dropdown
 ttk.Label(frame, text="Armour Type:").grid(column=0, row=2, sticky=tk.W)
-armour_type = tk.StringVar(value=ARMOUR_OPTIONS[0])
-menu = ttk.OptionMenu(frame, armour_type, ARMOUR_OPTIONS[0], *ARMOUR_OPTIONS)
+armour_type = tk.StringVar(value="Standard")
+menu = ttk.OptionMenu(frame, armour_type, "Standard", *RAW_ARMOUR_TYPES)
+# Show points per ton in the dropdown entries while the variable holds the bare name
+for index, name in enumerate(RAW_ARMOUR_TYPES):
+    menu["menu"].entryconfigure(index, label=armour_label(name), value=name)
+# Keep the button text showing the decorated label of the selected armour
+armour_display = tk.StringVar(value=armour_label(armour_type.get()))
+armour_type.trace_add("write", lambda *args: armour_display.set(armour_label(armour_type.get())))
+menu.configure(textvariable=armour_display)
 menu.grid(column=1, row=2, sticky=tk.W)
 create_tooltip(menu, "Select armour type to determine points per ton")
 
@@ -314,14 +410,12 @@ btn.grid(column=0, row=7, columnspan=2, pady=10)
 # Results output
 canvas = tk.Canvas(frame, width=200, height=160)
 canvas.grid(column=0, row=8, columnspan=2, pady=10)
+init_canvas_items()
 
 result_text = tk.Text(frame, height=10)
 result_text.grid(column=0, row=9, columnspan=2, pady=5, sticky="nsew")
 
 # Apply initial mode
-if dark_mode.get():
-    apply_dark_mode()
-else:
-    apply_light_mode()
+apply_theme(DARK_THEME if dark_mode.get() else LIGHT_THEME)
 
 root.mainloop()